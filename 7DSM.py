@@ -1,12 +1,15 @@
 # ----- Imports -----------------------------------------------------------------------------------
 import asyncio
+import bisect
 import collections
+import concurrent.futures
 import json
 import os
 import psutil
 import re
 import requests
 import shutil
+import sqlite3
 import subprocess
 import sys
 import tarfile
@@ -15,6 +18,7 @@ import time
 import xml.etree.ElementTree as ET
 import zipfile
 
+from contextlib import closing
 from datetime import datetime
 from dotenv import load_dotenv
 import zstandard as zstd  # ✅ High-speed compression
@@ -25,6 +29,8 @@ load_dotenv()
 
 # ----- Classes -----------------------------------------------------------------------------------
 
+ServerEvent = collections.namedtuple("ServerEvent", ["kind", "time", "data"])
+
 class ServerAPI:
     """Handles authentication and communication with the 7 Days to Die server API dynamically."""
 
@@ -69,6 +75,551 @@ class ServerAPI:
         """Shortcut for POST requests"""
         return self.request("POST", endpoint, data=data)
 
+class ClaimIndex:
+    """Persistent grid index of land claims across save games, refreshed incrementally from players.xml."""
+
+    VERSION = 2  # ✅ Bump when player ids or records change shape, so old index files are rebuilt
+
+    def __init__(self, path=None, cell_size=None):
+        """Load the saved index from disk, if there is one."""
+        self.path = path or CLAIM_INDEX_PATH
+        self.cell_size = cell_size or CLAIM_INDEX_CELL
+        self.saves = {}  # ✅ save -> {"mtime", "size", "players": {steam_id: record}}
+        self.cells = {}  # ✅ save -> {"cx,cz": [[steam_id, x, y, z], ...]}
+        self.logins = []  # ✅ Sorted (last_login, save, steam_id) for expiry queries
+        self.load()
+
+    def load(self):
+        """Reads the index file, starting empty if it is missing, unreadable, outdated or built with another cell size."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get("version") != self.VERSION or data.get("cell_size") != self.cell_size:
+            return
+
+        self.saves = data.get("saves", {})
+        self.cells = data.get("cells", {})
+        self.rebuild_logins()
+
+    def save(self):
+        """Writes the index to disk atomically."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "cell_size": self.cell_size, "saves": self.saves, "cells": self.cells}, f)
+        os.replace(temp_path, self.path)
+
+    def cell_key(self, x, z):
+        """Returns the grid cell key for a block position."""
+        return f"{x // self.cell_size},{z // self.cell_size}"
+
+    def rebuild_logins(self):
+        """Rebuilds the sorted last-login list from the player records."""
+        self.logins = sorted(
+            (record["last_login"], save, steam_id)
+            for save, entry in self.saves.items()
+            for steam_id, record in entry["players"].items()
+            if record["last_login"] is not None
+        )
+
+    def add_player(self, save, steam_id, record):
+        """Adds a player's claims to the grid."""
+        self.saves[save]["players"][steam_id] = record
+        cells = self.cells.setdefault(save, {})
+        for x, y, z in record["claims"]:
+            cells.setdefault(self.cell_key(x, z), []).append([steam_id, x, y, z])
+
+    def remove_player(self, save, steam_id):
+        """Removes a player's claims from the grid."""
+        record = self.saves[save]["players"].pop(steam_id, None)
+        if record is None:
+            return
+
+        cells = self.cells.get(save, {})
+        for x, _, z in record["claims"]:
+            key = self.cell_key(x, z)
+            cells[key] = [claim for claim in cells.get(key, []) if claim[0] != steam_id]
+            if not cells[key]:
+                del cells[key]
+
+    def refresh(self):
+        """Re-reads only the save games whose players.xml changed, and only re-indexes players that changed.
+
+        Returns the number of players added, updated or removed.
+        """
+        changed = 0
+        seen = set()
+
+        for save_dir in find_save_games():
+            save = os.path.relpath(save_dir, SERVER_SAVES_PATH)
+            seen.add(save)
+            players_path = find_players_file(save_dir)
+            stat = os.stat(players_path) if players_path else None
+            signature = {"mtime": stat.st_mtime, "size": stat.st_size} if stat else {"mtime": None, "size": None}
+
+            entry = self.saves.get(save)
+            if entry and entry["mtime"] == signature["mtime"] and entry["size"] == signature["size"]:
+                continue  # ✅ Unchanged since the last run
+
+            players = load_player_claims(save_dir)
+            if players is None:
+                continue  # ✅ Keep the old data rather than dropping claims on a bad read
+
+            entry = self.saves.setdefault(save, {"players": {}})
+            entry.update(signature)
+
+            new_records = {
+                player["steam_id"]: {
+                    "name": player["name"],
+                    "last_login": player["last_login"].timestamp() if player["last_login"] else None,
+                    "claims": [list(pos) for pos in player["claims"]],
+                }
+                for player in players
+            }
+
+            for steam_id in set(entry["players"]) - set(new_records):
+                self.remove_player(save, steam_id)
+                changed += 1
+
+            for steam_id, record in new_records.items():
+                if entry["players"].get(steam_id) != record:
+                    self.remove_player(save, steam_id)
+                    self.add_player(save, steam_id, record)
+                    changed += 1
+
+        for save in set(self.saves) - seen:
+            changed += len(self.saves.pop(save)["players"])
+            self.cells.pop(save, None)
+
+        self.rebuild_logins()
+        self.save()
+        return changed
+
+    def describe(self, save, claim):
+        """Turns a stored claim into a result row with its owner details."""
+        steam_id, x, y, z = claim
+        record = self.saves[save]["players"].get(steam_id, {})
+        return {
+            "save": save,
+            "steam_id": steam_id,
+            "name": record.get("name", ""),
+            "last_login": record.get("last_login"),
+            "x": x,
+            "y": y,
+            "z": z,
+        }
+
+    def expired(self, days=None):
+        """Returns claims whose owner has not logged in for `days` (LandClaimExpiryTime by default)."""
+        cutoff = time.time() - (days if days is not None else LAND_CLAIM_EXPIRY_DAYS) * 86400
+        results = []
+
+        for _, save, steam_id in self.logins[:bisect.bisect_left(self.logins, (cutoff,))]:
+            for x, y, z in self.saves[save]["players"][steam_id]["claims"]:
+                results.append(self.describe(save, [steam_id, x, y, z]))
+
+        return results
+
+    def in_area(self, min_x, min_z, max_x, max_z):
+        """Returns claims inside a block rectangle (inclusive)."""
+        results = []
+        for save, cells in self.cells.items():
+            for cx in range(min_x // self.cell_size, max_x // self.cell_size + 1):
+                for cz in range(min_z // self.cell_size, max_z // self.cell_size + 1):
+                    for claim in cells.get(f"{cx},{cz}", []):
+                        if min_x <= claim[1] <= max_x and min_z <= claim[3] <= max_z:
+                            results.append(self.describe(save, claim))
+        return results
+
+    def in_region(self, region_x, region_z):
+        """Returns claims inside region file r.X.Z.7rg."""
+        min_x, min_z = region_x * REGION_SIZE, region_z * REGION_SIZE
+        return self.in_area(min_x, min_z, min_x + REGION_SIZE - 1, min_z + REGION_SIZE - 1)
+
+    def near(self, x, z, radius):
+        """Returns claims within `radius` blocks of X,Z, closest first."""
+        results = [
+            claim for claim in self.in_area(x - radius, z - radius, x + radius, z + radius)
+            if (claim["x"] - x) ** 2 + (claim["z"] - z) ** 2 <= radius ** 2
+        ]
+        return sorted(results, key=lambda c: (c["x"] - x) ** 2 + (c["z"] - z) ** 2)
+
+class EventSubscriber:
+    """A bounded queue and worker thread that delivers event bus events to one handler."""
+
+    POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+    def __init__(self, name, handler, kinds=None, maxsize=1000, policy="drop_oldest", coalesce_key=None,
+                 batch_size=1, batch_interval=0, warn_on_drop=False):
+        """Start the worker. `coalesce` keeps only the newest event per key (the event kind by default).
+
+        With batch_size > 1 the handler gets a list of up to batch_size events, gathered for up to batch_interval seconds.
+        With warn_on_drop every dropped event is printed, for subscribers where a drop matters.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"❌ Unknown event policy '{policy}'. Use one of {', '.join(self.POLICIES)}.")
+
+        self.name = name
+        self.handler = handler
+        self.kinds = set(kinds) if kinds else None
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce_key = coalesce_key or (lambda event: event.kind)
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.warn_on_drop = warn_on_drop
+
+        self.queue = collections.deque()  # ✅ Events, or coalesce keys when coalescing
+        self.pending = {}  # ✅ Coalesce key -> newest event
+        self.pending_since = {}  # ✅ Coalesce key -> time of the first event it replaced, for honest lag
+        self.condition = threading.Condition()
+        self.busy = False
+        self.running = True
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.handling_seconds = 0.0
+
+        self.thread = threading.Thread(target=self.run, name=f"event-{name}", daemon=True)
+        self.thread.start()
+
+    def drop(self, event):
+        """Counts a dropped event, and reports it if this subscriber cares about drops."""
+        self.dropped += 1
+        if self.warn_on_drop:
+            print(f"⚠ Event subscriber {self.name} is full, dropped {event.kind}: {event.data}")
+
+    def offer(self, event):
+        """Queues an event without ever blocking the publisher."""
+        with self.condition:
+            self.published += 1
+
+            if self.policy == "coalesce":
+                key = self.coalesce_key(event)
+                if key in self.pending:
+                    self.pending[key] = event
+                    self.coalesced += 1
+                    return
+                if len(self.queue) >= self.maxsize:
+                    self.drop(event)
+                    return
+                self.pending[key] = event
+                self.pending_since[key] = event.time
+                self.queue.append(key)
+            elif len(self.queue) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.drop(event)
+                    return
+                self.drop(self.queue.popleft())
+                self.queue.append(event)
+            else:
+                self.queue.append(event)
+
+            self.condition.notify_all()  # ✅ drain() waits on the same condition
+
+    def run(self):
+        """Worker loop: hands queued events to the handler one at a time."""
+        while True:
+            with self.condition:
+                while not self.queue and self.running:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+
+                # ✅ Let a batch build up, so a burst of events becomes one handler call
+                if self.batch_size > 1 and self.batch_interval and len(self.queue) < self.batch_size:
+                    self.condition.wait_for(
+                        lambda: len(self.queue) >= self.batch_size or not self.running, self.batch_interval
+                    )
+
+                items = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+                if self.policy == "coalesce":
+                    events = [self.pending.pop(item) for item in items]
+                    for item in items:
+                        self.pending_since.pop(item, None)
+                else:
+                    events = items
+                self.busy = True
+
+            start_time = time.perf_counter()
+            try:
+                self.handler(events if self.batch_size > 1 else events[0])
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Event subscriber {self.name} failed: {e}")
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.delivered += len(events)
+                    self.handling_seconds += time.perf_counter() - start_time
+                    self.condition.notify_all()
+
+    def drain(self, timeout=None):
+        """Waits until the queue is empty and the handler is idle. Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.queue and not self.busy, timeout)
+
+    def stop(self):
+        """Stops the worker once the queued events are delivered."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def stats(self):
+        """Returns queue depth, lag, backlog and delivery counters.
+
+        lag_seconds is the age of the oldest queued event. backlog_seconds estimates how long the queue
+        takes to clear at the measured handling rate, which also shows a full queue that keeps dropping.
+        """
+        with self.condition:
+            oldest = None
+            if self.queue:
+                oldest = self.pending_since[self.queue[0]] if self.policy == "coalesce" else self.queue[0].time
+
+            per_event = self.handling_seconds / self.delivered if self.delivered else 0.0
+
+            return {
+                "name": self.name,
+                "policy": self.policy,
+                "queued": len(self.queue),
+                "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+                "backlog_seconds": round(len(self.queue) * per_event, 3),
+                "undelivered": self.published - self.delivered,
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+            }
+
+class EventBus:
+    """Fans out events parsed from the server log to subscribers, each with its own bounded queue."""
+
+    def __init__(self):
+        """Start with no subscribers."""
+        self.subscribers = []
+
+    def subscribe(self, name, handler, kinds=None, maxsize=1000, policy="drop_oldest", coalesce_key=None,
+                  batch_size=1, batch_interval=0, warn_on_drop=False):
+        """Registers a handler for the given event kinds (all kinds if None) and returns its subscriber."""
+        subscriber = EventSubscriber(
+            name, handler, kinds, maxsize, policy, coalesce_key, batch_size, batch_interval, warn_on_drop
+        )
+        self.subscribers = self.subscribers + [subscriber]  # ✅ Copy on write, publish never locks
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Removes a subscriber and stops its worker."""
+        self.subscribers = [s for s in self.subscribers if s is not subscriber]
+        subscriber.stop()
+
+    def publish(self, kind, **data):
+        """Offers an event to every interested subscriber. Never blocks on a slow subscriber."""
+        event = ServerEvent(kind, time.time(), data)
+        for subscriber in self.subscribers:
+            if subscriber.kinds is None or kind in subscriber.kinds:
+                subscriber.offer(event)
+
+    def drain(self, timeout=None):
+        """Waits for every subscriber to finish its queue. Returns False if any timed out."""
+        return all([subscriber.drain(timeout) for subscriber in self.subscribers])
+
+    def stats(self):
+        """Returns the stats of every subscriber."""
+        return [subscriber.stats() for subscriber in self.subscribers]
+
+class SessionStore:
+    """Player session history in SQLite (WAL), written in batches by an event bus subscriber."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY,
+            steam_id TEXT NOT NULL,
+            name TEXT,
+            start REAL NOT NULL,
+            end REAL,
+            end_reason TEXT,
+            last_seen REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_steam_start ON sessions (steam_id, start);
+        CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start);
+        CREATE INDEX IF NOT EXISTS idx_sessions_open ON sessions (end) WHERE end IS NULL;
+        CREATE TABLE IF NOT EXISTS daily_playtime (
+            steam_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            PRIMARY KEY (steam_id, day)
+        );
+    """
+
+    def __init__(self, path=None, retention_days=None):
+        """The database is only opened on first use."""
+        self.path = path or SESSIONS_DB_PATH
+        self.retention_days = retention_days or SESSIONS_RETENTION_DAYS
+        self.writer = None  # ✅ Owned by the bus worker thread
+        self.last_compaction = 0
+        self.batches = 0
+        self.rows = 0
+
+    def connect(self):
+        """Opens a connection in WAL mode and makes sure the schema exists."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # ✅ Safe with WAL, one fsync per checkpoint
+        conn.executescript(self.SCHEMA)
+
+        # ✅ Databases created before last_seen existed
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "last_seen" not in columns:
+            conn.execute("ALTER TABLE sessions ADD COLUMN last_seen REAL")
+
+        return conn
+
+    def write_batch(self, events):
+        """Event bus handler: applies a batch of session events in a single transaction."""
+        if self.writer is None:
+            self.writer = self.connect()
+
+        last_stats = None
+
+        def mark_seen():
+            """Stamps open sessions with the latest stats line, so lost sessions end when players were last seen."""
+            if last_stats is not None:
+                self.writer.execute("UPDATE sessions SET last_seen = ? WHERE end IS NULL", (last_stats,))
+
+        with self.writer:
+            for event in events:
+                data = event.data
+                if event.kind == EVENT_STATS:
+                    last_stats = event.time  # ✅ Only the newest stats line in a run matters
+                    continue
+
+                mark_seen()
+                last_stats = None
+
+                if event.kind == EVENT_PLAYER_AUTH:
+                    # ✅ A rejoin without a disconnect line closes the previous session
+                    self.writer.execute(
+                        "UPDATE sessions SET end = ?, end_reason = 'rejoin' WHERE steam_id = ? AND end IS NULL",
+                        (event.time, data["steam_id"])
+                    )
+                    self.writer.execute(
+                        "INSERT INTO sessions (steam_id, name, start, last_seen) VALUES (?, ?, ?, ?)",
+                        (data["steam_id"], data["name"], event.time, event.time)
+                    )
+                elif event.kind == EVENT_PLAYER_LEAVE:
+                    self.writer.execute(
+                        "UPDATE sessions SET end = ?, end_reason = 'leave' WHERE steam_id = ? AND end IS NULL",
+                        (event.time, data["steam_id"])
+                    )
+                elif event.kind == EVENT_SERVER_STOP:
+                    self.writer.execute(
+                        "UPDATE sessions SET end = ?, end_reason = 'server_stop' WHERE end IS NULL",
+                        (event.time,)
+                    )
+                elif event.kind == EVENT_SERVER_START:
+                    # ✅ Sessions left open by a missed stop end when the player was last seen, not now
+                    self.writer.execute(
+                        "UPDATE sessions SET end = COALESCE(last_seen, start), end_reason = 'unknown' WHERE end IS NULL"
+                    )
+
+            mark_seen()
+
+        self.batches += 1
+        self.rows += len(events)
+
+        if time.time() - self.last_compaction > 86400:
+            self.compact(self.writer)
+
+    def compact(self, conn=None):
+        """Rolls sessions older than the retention period into daily totals and deletes them.
+
+        Returns the number of sessions removed.
+        """
+        own_conn = conn is None
+        conn = conn or self.connect()
+        cutoff = time.time() - self.retention_days * 86400
+
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT INTO daily_playtime (steam_id, day, seconds)
+                    SELECT steam_id, date(start, 'unixepoch', 'localtime'), SUM(end - start)
+                    FROM sessions WHERE end IS NOT NULL AND end < ?
+                    GROUP BY steam_id, date(start, 'unixepoch', 'localtime')
+                    ON CONFLICT (steam_id, day) DO UPDATE SET seconds = seconds + excluded.seconds
+                """, (cutoff,))
+                removed = conn.execute("DELETE FROM sessions WHERE end IS NOT NULL AND end < ?", (cutoff,)).rowcount
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("PRAGMA optimize")
+        finally:
+            if own_conn:
+                conn.close()
+
+        self.last_compaction = time.time()
+        return removed
+
+    def played_seconds(self, steam_id, since, until=None):
+        """Returns seconds played by a Steam ID between two timestamps.
+
+        Open sessions count up to when the player was last seen plus a grace period, so a session the log
+        never closed does not keep growing.
+        """
+        until = until or time.time()
+        with closing(self.connect()) as conn:
+            recent = conn.execute("""
+                SELECT COALESCE(SUM(MIN(ended, :until) - MAX(start, :since)), 0) FROM (
+                    SELECT start, COALESCE(end, MIN(:now, COALESCE(last_seen, start) + :grace)) AS ended
+                    FROM sessions WHERE steam_id = :steam_id AND start < :until
+                ) WHERE ended > :since
+            """, {"until": until, "since": since, "now": time.time(), "grace": SESSIONS_GRACE_SECONDS,
+                  "steam_id": steam_id}).fetchone()[0]
+
+            # ✅ Compacted history only has whole days
+            compacted = conn.execute("""
+                SELECT COALESCE(SUM(seconds), 0) FROM daily_playtime
+                WHERE steam_id = ? AND day >= date(?, 'unixepoch', 'localtime') AND day < date(?, 'unixepoch', 'localtime')
+            """, (steam_id, since, until)).fetchone()[0]
+
+        return recent + compacted
+
+    def online_at(self, timestamp):
+        """Returns (steam_id, name, start, end) for every session open at a timestamp.
+
+        Open sessions only count while the player was seen within the grace period.
+        """
+        with closing(self.connect()) as conn:
+            return conn.execute("""
+                SELECT steam_id, name, start, end FROM sessions
+                WHERE start <= :at AND COALESCE(end, COALESCE(last_seen, start) + :grace) >= :at ORDER BY start
+            """, {"at": timestamp, "grace": SESSIONS_GRACE_SECONDS}).fetchall()
+
+    def history(self, steam_id, limit=20):
+        """Returns the most recent (name, start, end, end_reason) sessions for a Steam ID."""
+        with closing(self.connect()) as conn:
+            return conn.execute("""
+                SELECT name, start, end, end_reason FROM sessions
+                WHERE steam_id = ? ORDER BY start DESC LIMIT ?
+            """, (steam_id, limit)).fetchall()
+
+    def find_steam_id(self, player):
+        """Resolves a Steam ID or player name to a Steam ID (latest session wins for names)."""
+        if player.startswith("Steam_"):
+            return player
+        if player.isdigit():
+            return f"Steam_{player}"
+
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT steam_id FROM sessions WHERE name = ? ORDER BY start DESC LIMIT 1", (player,)
+            ).fetchone()
+        return row[0] if row else None
+
 # ----- Global Variables --------------------------------------------------------------------------
 
 SERVER_APP_ID = "294420"
@@ -87,8 +638,49 @@ VIP_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vip_li
 MAX_PLAYERS = 0
 CURRENT_PLAYERS = 0  # ✅ Initialize globally
 STEAM_AUTH_DELAY = 2  # ✅ Give Steam 2 seconds to authenticate before kicking
+BACKUP_WORKERS = int(os.getenv("BACKUPSETTINGS_Workers", str(min(4, os.cpu_count() or 1))))
+BACKUP_THREADS = int(os.getenv("BACKUPSETTINGS_Threads", "-1"))  # ✅ zstd threads per target, -1 = all cores
+BACKUP_SAMPLE_SIZE = 4 * 1024 * 1024  # ✅ Bytes read when sampling a target for compressibility
+BACKUP_STORE_RATIO = 0.95  # ✅ Samples that shrink less than this are stored uncompressed
+BACKUP_DEFAULT_POLICY = {"level": 10, "long": False, "sample": True}
+BACKUP_POLICIES = {
+    "logs": {"level": 19, "long": True, "sample": False},  # ✅ Plain text, compresses very well
+    "mods": {"level": 3, "long": False, "sample": True},  # ✅ Mostly bundles and DLLs, already compressed
+    "data_worlds": {"level": 10, "long": True, "sample": True},  # ✅ Large region files with repeated data
+    "userdatafolder": {"level": 10, "long": True, "sample": True},
+}
+SERVER_SAVES_PATH = os.path.join(SERVER_DIR, "UserDataFolder", "Saves")
+REGION_SIZE = 512  # ✅ Each r.X.Z.7rg region file covers 512x512 blocks
+REGION_FILE_REGEX = re.compile(r"^r\.(-?\d+)\.(-?\d+)\.7rg$")
+REGIONRESET_DAYS = int(os.getenv("REGIONRESET_Days", "30"))
+REGIONRESET_MARGIN = int(os.getenv("REGIONRESET_Margin", "64"))  # ✅ Extra blocks kept around claims and bedrolls
+REGIONRESET_WORKERS = min(16, (os.cpu_count() or 1) * 2)  # ✅ Stat/delete is I/O bound
+LAND_CLAIM_SIZE = int(os.getenv("SERVERCONFIG_LandClaimSize", "41"))
+LAST_LOGIN_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %H:%M:%S"]
+BACKUP_ESTIMATE_RATE = 50 * 1024 * 1024  # ✅ Bytes/second assumed when no backup manifest exists yet
+CLAIM_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "claim_index.json")
+CLAIM_INDEX_CELL = 128  # ✅ Grid cell size in blocks, 16 cells per region
+LAND_CLAIM_EXPIRY_DAYS = int(os.getenv("SERVERCONFIG_LandClaimExpiryTime", "7"))
+WEBHOOK_URL = os.getenv("WEBHOOK_Url", "")
+WEBHOOK_BATCH_SIZE = 25  # ✅ Events folded into one post
+WEBHOOK_BATCH_INTERVAL = 2.0  # ✅ Seconds a post waits for its batch to fill
+WEBHOOK_MAX_LENGTH = 2000  # ✅ Discord message content limit
+WEBHOOK_RETRIES = 3  # ✅ Rate-limited (429) attempts before giving up on a post
+EVENT_PLAYER_JOIN = "player_join"
+EVENT_PLAYER_LEAVE = "player_leave"
+EVENT_PLAYER_AUTH = "player_auth"
+EVENT_ERROR = "error"
+EVENT_STATS = "stats"
+EVENT_CHAT = "chat"
+EVENT_SERVER_START = "server_start"
+EVENT_SERVER_STOP = "server_stop"
+SESSIONS_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db")
+SESSIONS_RETENTION_DAYS = int(os.getenv("SESSIONS_RetentionDays", "180"))
+SESSIONS_GRACE_SECONDS = 120  # ✅ Open sessions count this long past the last stats line, a few stats intervals
 
 api = ServerAPI(base_url="http://localhost:8080") 
+EVENT_BUS = EventBus()
+SESSION_STORE = SessionStore()
 # ----- Functions / Definitions -------------------------------------------------------------------
 
 def install_steam():
@@ -398,20 +990,14 @@ async def monitor_server():
 
     while True:
         # ✅ Check if the server process is running
-        server_running = any(
-            proc.info["name"].lower() == "7daystodieserver.exe"
-            for proc in psutil.process_iter(["name"])
-        )
+        server_running = is_server_running()
 
         if not server_running:
             print("\n\n❌ Server has stopped! Attempting restart...")
             await asyncio.sleep(5)  # ✅ Short delay before retrying
 
             # ✅ Double-check if the server is still down before restarting
-            server_running = any(
-                proc.info["name"].lower() == "7daystodieserver.exe"
-                for proc in psutil.process_iter(["name"])
-            )
+            server_running = is_server_running()
 
             if not server_running:
                 print("🔄 Restarting the server...")
@@ -442,14 +1028,12 @@ def restart_server():
 async def stop():
     """Immediately stops the game server without a graceful shutdown (Version 1)."""
 
-    # Use the global variable SERVER_EXE
-    server_exe = SERVER_EXE
-
     # Check if the server is running
-    server_running = any(proc.info["name"] == server_exe for proc in psutil.process_iter(["name"]))
+    server_running = is_server_running()
 
     if not server_running:
         print("⚠ Server is not running.")
+        EVENT_BUS.drain(timeout=5)  # ✅ Let subscribers finish writing before exiting
         sys.exit()  # ✅ Exit the program if the server is not running
 
     print("⚠ Initiating immediate server shutdown...")
@@ -457,18 +1041,156 @@ async def stop():
     # Directly force-terminate the server
     kill_server_process()
 
+    # ✅ Close open sessions now; the daemon workers die with the program
+    EVENT_BUS.publish(EVENT_SERVER_STOP)
+    EVENT_BUS.drain(timeout=5)
+
     print("✅ Server stopped.")
     sys.exit()  # ✅ Exit the program after stopping the server
 
+def is_server_process(process):
+    """Checks if a psutil process is the game server, by name or by script path (stand-in servers on Linux)."""
+    if process.info.get("status") == psutil.STATUS_ZOMBIE:
+        return False  # ✅ Exited but not yet reaped
+
+    server_exe = SERVER_EXE.lower()
+    name = (process.info.get("name") or "").lower()
+
+    # ✅ Linux truncates process names to 15 characters
+    if name == server_exe or (len(name) >= 15 and server_exe.startswith(name)):
+        return True
+
+    # ✅ Stand-in servers are Python scripts; only trust the script path when a Python interpreter runs it,
+    # so an editor or debugger opened on the exe is never matched (and never killed)
+    cmdline = process.info.get("cmdline") or []
+    return (
+        len(cmdline) >= 2
+        and os.path.basename(cmdline[0]).lower().startswith("python")
+        and os.path.basename(cmdline[1]).lower() == server_exe
+    )
+
+def is_server_running():
+    """Checks if the game server process is running."""
+    return any(is_server_process(proc) for proc in psutil.process_iter(["name", "cmdline", "status"]))
+
 def kill_server_process():
     """Finds and forcefully kills the server process."""
-    for process in psutil.process_iter(["name"]):
-        if process.info["name"] == SERVER_EXE:
+    for process in psutil.process_iter(["name", "cmdline", "status"]):
+        if is_server_process(process):
             print(f"🚨 Terminating process: {SERVER_EXE}")
             process.terminate()
 
+def get_backup_policy(key):
+    """Returns the compression policy for a backup target, applying BACKUPPOLICY_ overrides from .env.
+
+    Override format: BACKUPPOLICY_Mods="level=3,long=false,sample=true" or BACKUPPOLICY_Mods="store".
+    """
+    policy = dict(BACKUP_POLICIES.get(key, BACKUP_DEFAULT_POLICY))
+
+    override = next(
+        (value for env_key, value in os.environ.items()
+         if env_key.startswith("BACKUPPOLICY_") and env_key.replace("BACKUPPOLICY_", "").lower() == key),
+        None
+    )
+    if not override:
+        return policy
+
+    for option in override.split(","):
+        option = option.strip().lower()
+        if option == "store":
+            policy["level"] = 0
+            continue
+
+        name, _, value = option.partition("=")
+        try:
+            if name == "level":
+                policy["level"] = max(0, min(22, int(value)))
+            elif name in ("long", "sample"):
+                policy[name] = value == "true"
+            else:
+                print(f"⚠ Ignoring unknown backup policy option '{option}' for {key}.")
+        except ValueError:
+            print(f"⚠ Ignoring invalid backup policy option '{option}' for {key}.")
+
+    return policy
+
+def is_compressible(path):
+    """Samples the start of the files under a path and checks whether zstd can shrink them."""
+    if os.path.isfile(path):
+        files = [path]
+    else:
+        files = (os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+
+    sample = bytearray()
+    chunk_size = 64 * 1024  # ✅ Take a slice from many files rather than all of one
+
+    for file_path in files:
+        try:
+            with open(file_path, "rb") as f:
+                sample += f.read(chunk_size)
+        except OSError:
+            continue
+        if len(sample) >= BACKUP_SAMPLE_SIZE:
+            break
+
+    if not sample:
+        return True
+
+    compressed = zstd.ZstdCompressor(level=1).compress(bytes(sample))
+    return len(compressed) / len(sample) < BACKUP_STORE_RATIO
+
+def backup_target(key, path, set_dir, working_dir):
+    """Archives a single backup target into the backup set using its compression policy."""
+    start_time = time.time()
+    policy = get_backup_policy(key)
+
+    if policy["level"] > 0 and policy["sample"] and not is_compressible(path):
+        policy["level"] = 0  # ✅ Incompressible data, store only
+
+    arcname = os.path.relpath(path, start=working_dir)
+    source_bytes = 0
+
+    def count_bytes(tarinfo):
+        """Tallies the uncompressed size of everything added to the archive."""
+        nonlocal source_bytes
+        source_bytes += tarinfo.size
+        return tarinfo
+
+    if policy["level"] == 0:
+        archive_path = os.path.join(set_dir, f"{key}.tar")
+        with tarfile.open(archive_path, "w") as tar:
+            tar.add(path, arcname=arcname, filter=count_bytes)
+    else:
+        archive_path = os.path.join(set_dir, f"{key}.tar.zst")
+        if policy["long"]:
+            # ✅ Long-distance matching with a 128 MB window, within the default decoder limit
+            params = zstd.ZstdCompressionParameters.from_level(
+                policy["level"], enable_ldm=True, window_log=27, threads=BACKUP_THREADS
+            )
+            cctx = zstd.ZstdCompressor(compression_params=params)
+        else:
+            # ✅ Multi-threaded, so one big target (the saves) is not stuck on a single core
+            cctx = zstd.ZstdCompressor(level=policy["level"], threads=BACKUP_THREADS)
+
+        # ✅ Stream the tar straight into the compressor, no temporary .tar on disk
+        with open(archive_path, "wb") as compressed_backup, \
+             cctx.stream_writer(compressed_backup) as compressor, \
+             tarfile.open(fileobj=compressor, mode="w|") as tar:
+            tar.add(path, arcname=arcname, filter=count_bytes)
+
+    return {
+        "target": key,
+        "source": arcname,
+        "archive": os.path.basename(archive_path),
+        "level": policy["level"],
+        "long": policy["long"],
+        "source_bytes": source_bytes,
+        "size": os.path.getsize(archive_path),
+        "seconds": round(time.time() - start_time, 2),
+    }
+
 def backup():
-    """Creates a highly compressed backup based on .env settings, allowing subdirectory backups."""
+    """Creates a backup set with one archive per target, each compressed with its own policy in parallel."""
     load_dotenv()  # ✅ Ensure .env is loaded
 
     print("🔄 Starting backup process...")
@@ -490,17 +1212,8 @@ def backup():
         print("❌ Server directory not found. Backup cannot proceed.")
         return
 
-    # ✅ Get all top-level items in `Server/` (case-insensitive)
-    server_items = {item.lower(): os.path.join(server_dir, item) for item in os.listdir(server_dir)}
-
-    # ✅ List of items to back up
-    backup_items = []
-
-    # ✅ Always include .env from working directory
-    env_path = os.path.join(working_dir, ".env")
-    if os.path.exists(env_path):
-        print("✅ Including .env in backup.")
-        backup_items.append(env_path)
+    # ✅ Targets to back up, keyed by their BACKUPCONFIG_ name
+    backup_items = {}
 
     # ✅ Check for each required backup item inside `Server/`
     for key, should_backup in backup_targets.items():
@@ -514,7 +1227,7 @@ def backup():
 
             if os.path.exists(matched_path):
                 print(f"✅ Including {matched_path} in backup.")
-                backup_items.append(matched_path)
+                backup_items[key] = matched_path
             else:
                 print(f"⚠ Skipping {key.replace('_', '/')} : Not found in Server directory.")
 
@@ -522,35 +1235,51 @@ def backup():
         print("❌ No items to back up. Exiting backup process.")
         return
 
-    # ✅ Define backup filename
+    # ✅ Define backup set folder
     timestamp = time.strftime("%Y-%m-%d_%H-%M-%S")
-    backup_filename = f"backup_{timestamp}.tar.zst"
-    backup_path = os.path.join(working_dir, backup_filename)
+    set_name = f"backup_{timestamp}"
+    set_dir = os.path.join(working_dir, set_name)
+    os.makedirs(set_dir, exist_ok=True)
 
-    print(f"📦 Creating backup: {backup_filename}")
+    print(f"📦 Creating backup set: {set_name} ({len(backup_items)} targets, {BACKUP_WORKERS} workers)")
 
-    try:
-        tar_filename = f"backup_{timestamp}.tar"
-        tar_path = os.path.join(working_dir, tar_filename)
+    # ✅ Always include .env from working directory
+    env_path = os.path.join(working_dir, ".env")
+    if os.path.exists(env_path):
+        print("✅ Including .env in backup.")
+        shutil.copy2(env_path, os.path.join(set_dir, ".env"))
 
-        # ✅ Create a .tar file
-        with tarfile.open(tar_path, "w") as tar:
-            for item in backup_items:
-                tar.add(item, arcname=os.path.relpath(item, start=working_dir))  # ✅ Preserve folder structure in tar
+    results = []
+    failed = False
 
-        # ✅ Compress the .tar file using streaming zstd
-        with open(tar_path, "rb") as tar_file, open(backup_path, "wb") as compressed_backup:
-            cctx = zstd.ZstdCompressor(level=10)
-            with cctx.stream_writer(compressed_backup) as compressor:
-                shutil.copyfileobj(tar_file, compressor)  # ✅ Stream-based compression
+    # ✅ Targets are independent, so compress them concurrently (zstd releases the GIL)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, BACKUP_WORKERS)) as executor:
+        futures = {
+            executor.submit(backup_target, key, path, set_dir, working_dir): key
+            for key, path in backup_items.items()
+        }
 
-        # ✅ Cleanup the .tar file after compression
-        os.remove(tar_path)
+        for future in concurrent.futures.as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed = True
+                print(f"❌ Error backing up {key}: {e}")
+                continue
 
-        print(f"✅ Backup completed successfully: {backup_filename}")
+            results.append(result)
+            mode = "store" if result["level"] == 0 else f"level {result['level']}" + (" +long" if result["long"] else "")
+            print(f"✅ {result['archive']} ({mode}, {result['size'] / (1024 * 1024):.1f} MB, {result['seconds']:.2f}s)")
 
-    except Exception as e:
-        print(f"❌ Error creating backup: {e}")
+    # ✅ Record what went into the set so restores know which archive holds what
+    with open(os.path.join(set_dir, "manifest.json"), "w", encoding="utf-8") as manifest:
+        json.dump({"created": timestamp, "targets": sorted(results, key=lambda r: r["target"])}, manifest, indent=4)
+
+    if failed:
+        print(f"⚠ Backup completed with errors: {set_name}")
+    else:
+        print(f"✅ Backup completed successfully: {set_name}")
 
     # Record the end time
     end_time = time.time()
@@ -559,8 +1288,240 @@ def backup():
     elapsed_time = end_time - start_time
     print(f"⏱️ Backup process took {elapsed_time:.2f} seconds.")
 
+def find_save_games():
+    """Returns every save game folder (Saves/<World>/<Game>) that contains a Region folder."""
+    save_games = []
+    if not os.path.isdir(SERVER_SAVES_PATH):
+        return save_games
+
+    for world in sorted(os.listdir(SERVER_SAVES_PATH)):
+        world_dir = os.path.join(SERVER_SAVES_PATH, world)
+        if not os.path.isdir(world_dir):
+            continue
+        for game in sorted(os.listdir(world_dir)):
+            game_dir = os.path.join(world_dir, game)
+            if os.path.isdir(os.path.join(game_dir, "Region")):
+                save_games.append(game_dir)
+
+    return save_games
+
+def parse_last_login(value):
+    """Parses a player's lastlogin attribute, returning None if the format is unknown."""
+    if not value:
+        return None
+
+    for fmt in LAST_LOGIN_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+def parse_position(value):
+    """Parses a "x, y, z" block position into integers."""
+    try:
+        x, y, z = (int(float(part)) for part in value.split(","))
+        return x, y, z
+    except (AttributeError, ValueError):
+        return None
+
+def find_players_file(save_dir):
+    """Returns the path of a save's players.xml (persistentplayers.xml on older versions), or None."""
+    return next(
+        (os.path.join(save_dir, name) for name in ("players.xml", "persistentplayers.xml")
+         if os.path.exists(os.path.join(save_dir, name))),
+        None
+    )
+
+def load_player_claims(save_dir):
+    """Reads land claims, bedrolls and last login for every player in a save's players.xml.
+
+    Returns None if the file is missing or cannot be parsed, so callers never treat claims as missing.
+    """
+    players_path = find_players_file(save_dir)
+    if players_path is None:
+        return None
+
+    try:
+        root = ET.parse(players_path).getroot()
+    except ET.ParseError as e:
+        print(f"❌ Could not read {players_path}: {e}")
+        return None
+
+    players = []
+    for player in root.iter("player"):
+        # ✅ Crossplay saves key players by EOS id; prefer the native Steam id used everywhere else
+        if player.get("nativeplatform") == "Steam" and player.get("nativeuserid"):
+            platform, steam_id = "Steam", player.get("nativeuserid")
+        else:
+            platform, steam_id = player.get("platform"), player.get("userid") or player.get("id") or ""
+        if platform and not steam_id.startswith(platform):
+            steam_id = f"{platform}_{steam_id}"
+
+        players.append({
+            "steam_id": steam_id,
+            "name": player.get("playername", ""),
+            "last_login": parse_last_login(player.get("lastlogin")),
+            "claims": [pos for pos in (parse_position(b.get("pos")) for b in player.iter("lpblock")) if pos],
+            "bedrolls": [pos for pos in (parse_position(b.get("pos")) for b in player.iter("bedroll")) if pos],
+        })
+
+    return players
+
+def regions_near(x, z, radius):
+    """Returns the region coordinates touched by a square of the given radius around a block."""
+    return {
+        (rx, rz)
+        for rx in range((x - radius) // REGION_SIZE, (x + radius) // REGION_SIZE + 1)
+        for rz in range((z - radius) // REGION_SIZE, (z + radius) // REGION_SIZE + 1)
+    }
+
+def index_regions(save_dir):
+    """Indexes every region file in a save (coordinates, size, last modified) in parallel."""
+    region_dir = os.path.join(save_dir, "Region")
+
+    def stat_region(name):
+        match = REGION_FILE_REGEX.match(name)
+        stat = os.stat(os.path.join(region_dir, name))
+        return {
+            "path": os.path.join(region_dir, name),
+            "x": int(match.group(1)),
+            "z": int(match.group(2)),
+            "size": stat.st_size,
+            "modified": stat.st_mtime,
+        }
+
+    names = [name for name in os.listdir(region_dir) if REGION_FILE_REGEX.match(name)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=REGIONRESET_WORKERS) as executor:
+        return list(executor.map(stat_region, names))
+
+def plan_region_reset(save_dir, days):
+    """Works out which regions in a save have no active claim or bedroll and were not visited within `days`.
+
+    The region file's last modified time is the only visit signal. The server rewrites a region whenever its
+    chunks are saved, which happens while a player has them loaded. Player positions live in the binary
+    .ttp files and are not read.
+    """
+    if find_players_file(save_dir) is None:
+        print(f"❌ No players.xml found in {save_dir}.")
+        return None
+
+    players = load_player_claims(save_dir)
+    if players is None:
+        return None
+
+    cutoff = time.time() - days * 86400
+    radius = LAND_CLAIM_SIZE // 2 + REGIONRESET_MARGIN
+    protected = set()
+    active_claims = 0
+    expired_claims = 0
+
+    for player in players:
+        # ✅ Unknown login times count as active, never reset on a guess
+        active = player["last_login"] is None or player["last_login"].timestamp() >= cutoff
+
+        if not active:
+            expired_claims += len(player["claims"])
+            continue
+
+        active_claims += len(player["claims"])
+        for x, _, z in player["claims"] + player["bedrolls"]:
+            protected |= regions_near(x, z, radius)
+
+    regions = index_regions(save_dir)
+    recent = [r for r in regions if r["modified"] >= cutoff]  # ✅ Modified time is the visit signal
+    candidates = [r for r in regions if r["modified"] < cutoff and (r["x"], r["z"]) not in protected]
+
+    return {
+        "save": os.path.relpath(save_dir, SERVER_SAVES_PATH),
+        "players": len(players),
+        "active_claims": active_claims,
+        "expired_claims": expired_claims,
+        "regions": regions,
+        "protected": sum(1 for r in regions if (r["x"], r["z"]) in protected),
+        "recent": len(recent),
+        "candidates": candidates,
+    }
+
+def estimate_backup_rate():
+    """Returns (bytes per second, compression ratio) for the save folder from the latest backup manifest."""
+    working_dir = os.path.dirname(SERVER_DIR)
+    manifests = sorted(
+        os.path.join(working_dir, name, "manifest.json")
+        for name in os.listdir(working_dir)
+        if name.startswith("backup_") and os.path.exists(os.path.join(working_dir, name, "manifest.json"))
+    )
+
+    for manifest_path in reversed(manifests):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                targets = json.load(f).get("targets", [])
+        except (OSError, ValueError):
+            continue
+
+        for target in targets:
+            if target.get("target") == "userdatafolder" and target.get("source_bytes") and target.get("seconds"):
+                return target["source_bytes"] / target["seconds"], target["size"] / target["source_bytes"]
+
+    return BACKUP_ESTIMATE_RATE, None
+
+def remove_region(path):
+    """Deletes a region file so the server regenerates it, returning True on success."""
+    try:
+        os.remove(path)
+        return True
+    except OSError as e:
+        print(f"❌ Could not remove {path}: {e}")
+        return False
+
+def region_reset(days=None, dry_run=True):
+    """Resets (deletes) regions nobody has claimed or visited within `days`, or reports what would be saved."""
+    if days is None:
+        days = REGIONRESET_DAYS
+
+    if not dry_run and is_server_running():
+        print("❌ The server is running. Stop it before resetting regions.")
+        return
+
+    save_games = find_save_games()
+    if not save_games:
+        print(f"❌ No save games with a Region folder found in {SERVER_SAVES_PATH}.")
+        return
+
+    print(f"🗺️ Region reset {'dry run' if dry_run else 'started'}: untouched for {days} days, no active claims or bedrolls.")
+
+    rate, ratio = estimate_backup_rate()
+    total_bytes = 0
+    total_regions = 0
+
+    for save_dir in save_games:
+        plan = plan_region_reset(save_dir, days)
+        if plan is None:
+            print(f"⚠ Skipping {save_dir}: player data is missing or could not be read.")
+            continue
+
+        candidate_bytes = sum(r["size"] for r in plan["candidates"])
+        print(f"\n📁 {plan['save']}")
+        print(f"   Players: {plan['players']} | Active claims: {plan['active_claims']} | Expired claims: {plan['expired_claims']}")
+        print(f"   Regions: {len(plan['regions'])} | Protected: {plan['protected']} | Visited recently: {plan['recent']}")
+        print(f"   To reset: {len(plan['candidates'])} regions, {candidate_bytes / (1024 * 1024):.1f} MB")
+
+        if not dry_run and plan["candidates"]:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=REGIONRESET_WORKERS) as executor:
+                removed = list(executor.map(remove_region, (r["path"] for r in plan["candidates"])))
+            candidate_bytes = sum(r["size"] for r, ok in zip(plan["candidates"], removed) if ok)
+            print(f"✅ Reset {sum(removed)} regions.")
+
+        total_bytes += candidate_bytes
+        total_regions += len(plan["candidates"])
+
+    print(f"\n💾 {'Would free' if dry_run else 'Freed'} {total_bytes / (1024 * 1024):.1f} MB across {total_regions} regions.")
+    print(f"⏱️ Backups would take about {total_bytes / rate:.1f} seconds less.")
+    if ratio:
+        print(f"📦 Backup sets would be about {total_bytes * ratio / (1024 * 1024):.1f} MB smaller.")
+
 def stream_logs_to_files(proc, main_log, error_log):
-    """Streams server logs and extracts player-related data in real-time, properly handling errors."""
+    """Streams server logs, extracts player-related data in real-time and publishes events to EVENT_BUS."""
     global MAX_PLAYERS, CURRENT_PLAYERS
 
     CONTEXT_SIZE = 20
@@ -570,13 +1531,17 @@ def stream_logs_to_files(proc, main_log, error_log):
     shader_regex = re.compile(r'\b(Shader)\b', re.IGNORECASE)  # ✅ Ignore all Shader-related logs
     max_players_regex = re.compile(r"Maximum allowed players: (\d+)")
     player_count_regex = re.compile(r"Ply:\s*(\d+)")
-    player_join_regex = re.compile(r"PlayerLogin:\s*(.+)")
+    player_join_regex = re.compile(r"PlayerLogin:\s*(.+?)(?:/V\s[^/]*)?$")  # ✅ Name without the "/V 1.2" client version
     steam_id_regex = re.compile(r"PltfmId='(Steam_\d+)'")
     steam_auth_regex = re.compile(r"\[Steamworks\.NET\] Authenticating player: (.+) SteamId: (\d+)")
+    player_leave_regex = re.compile(r"Player disconnected: .*PltfmId='(Steam_\d+)'.*PlayerName='([^']*)'")
+    chat_regex = re.compile(r"Chat \(from '([^']*)', entity id '-?\d+', to '([^']*)'\): '([^']*)': (.*)")
 
     # ✅ Temporary storage for player names before Steam authentication
     pending_auth = {}
 
+    EVENT_BUS.publish(EVENT_SERVER_START)
+
     with open(main_log, 'w', encoding='utf-8') as main_f, \
          open(error_log, 'w', encoding='utf-8') as err_f:
 
@@ -608,12 +1573,14 @@ def stream_logs_to_files(proc, main_log, error_log):
             match_player_count = player_count_regex.search(line_stripped)
             if match_player_count:
                 CURRENT_PLAYERS = int(match_player_count.group(1))
+                EVENT_BUS.publish(EVENT_STATS, players=CURRENT_PLAYERS, max_players=MAX_PLAYERS)
 
             # ✅ Detect Player Join (Store in pending_auth)
             match_login = player_join_regex.search(line_stripped)
             if match_login:
                 player_name = match_login.group(1)
                 pending_auth[player_name] = None  # ✅ Store name, waiting for Steam ID
+                EVENT_BUS.publish(EVENT_PLAYER_JOIN, name=player_name)
 
             # ✅ Detect Steam ID (Assign to the correct player)
             match_steam = steam_id_regex.search(line_stripped)
@@ -632,8 +1599,21 @@ def stream_logs_to_files(proc, main_log, error_log):
                 player_name = match_auth.group(1)
                 steam_id = f"Steam_{match_auth.group(2)}"
 
-                # ✅ Now enforce VIP check
-                enforce_vip_access(player_name, steam_id)
+                # ✅ VIP check runs on the bus, so the Steam auth delay never stalls the log
+                EVENT_BUS.publish(EVENT_PLAYER_AUTH, name=player_name, steam_id=steam_id)
+
+            # ✅ Detect Player Leave
+            match_leave = player_leave_regex.search(line_stripped)
+            if match_leave:
+                steam_id, player_name = match_leave.groups()
+                pending_auth.pop(player_name, None)
+                EVENT_BUS.publish(EVENT_PLAYER_LEAVE, name=player_name, steam_id=steam_id)
+
+            # ✅ Detect Chat
+            match_chat = chat_regex.search(line_stripped)
+            if match_chat:
+                steam_id, channel, player_name, message = match_chat.groups()
+                EVENT_BUS.publish(EVENT_CHAT, name=player_name, steam_id=steam_id, channel=channel, message=message)
 
             # ✅ Write errors to error log (with 20-line buffer)
             if error_regex.search(line_stripped):
@@ -641,6 +1621,9 @@ def stream_logs_to_files(proc, main_log, error_log):
                     err_f.write(pline)
                 err_f.write("\n" * 5)  # ✅ Add spacing between errors
                 err_f.flush()
+                EVENT_BUS.publish(EVENT_ERROR, line=line_stripped)
+
+    EVENT_BUS.publish(EVENT_SERVER_STOP)
 
 def is_vip(steam_id):
     """Checks if a Steam ID is in the VIP list and not expired."""
@@ -676,8 +1659,11 @@ def is_vip(steam_id):
 
     return False
 
-def enforce_vip_access(player_name, steam_id):
-    """Checks if a joining player is VIP and kicks them if they are not."""
+def enforce_vip_access(player_name, steam_id, auth_time=None):
+    """Checks if a joining player is VIP and kicks them if they are not.
+
+    auth_time is when the Steam authentication line was read, so queued kicks only wait out what is left of the delay.
+    """
     global CURRENT_PLAYERS
 
     buffer_limit = MAX_PLAYERS - DONORBUFFER_SIZE
@@ -688,10 +1674,120 @@ def enforce_vip_access(player_name, steam_id):
     if is_vip(steam_id):
         return
 
-    # ✅ Wait for Steam authentication before kicking
-    time.sleep(STEAM_AUTH_DELAY)
+    # ✅ Wait for Steam authentication before kicking, counted from the auth line, not from now
+    delay = STEAM_AUTH_DELAY if auth_time is None else auth_time + STEAM_AUTH_DELAY - time.time()
+    if delay > 0:
+        time.sleep(delay)
     api.post("command", {"command": f'kick {steam_id} "Thank you for visiting. We are at max capacity. VIPs only may join at this time."'})
 
+def on_player_auth(event):
+    """Event bus handler: enforces the donor buffer when a player authenticates."""
+    enforce_vip_access(event.data["name"], event.data["steam_id"], event.time)
+
+def format_event(event):
+    """Turns a bus event into a short chat-style message."""
+    data = event.data
+    if event.kind == EVENT_PLAYER_JOIN:
+        return f"➡️ {data['name']} joined the server."
+    if event.kind == EVENT_PLAYER_LEAVE:
+        return f"⬅️ {data['name']} left the server."
+    if event.kind == EVENT_CHAT:
+        return f"💬 [{data['channel']}] {data['name']}: {data['message']}"
+    if event.kind == EVENT_ERROR:
+        return f"❌ {data['line']}"
+    return f"{event.kind}: {data}"
+
+def format_events(events):
+    """Turns a batch of bus events into messages, folding repeats of the same error into one line."""
+    messages = [(event.kind, format_event(event)) for event in events]
+    error_counts = collections.Counter(message for kind, message in messages if kind == EVENT_ERROR)
+
+    lines = []
+    for kind, message in messages:
+        if kind != EVENT_ERROR:
+            lines.append(message)
+        elif message in error_counts:
+            count = error_counts.pop(message)
+            lines.append(message if count == 1 else f"{message} (x{count})")
+    return lines
+
+def split_webhook_content(lines):
+    """Packs message lines into as few posts as fit the webhook length limit."""
+    posts = []
+    current = ""
+    for line in lines:
+        if len(line) > WEBHOOK_MAX_LENGTH:
+            line = line[:WEBHOOK_MAX_LENGTH - 3] + "..."
+        if current and len(current) + 1 + len(line) > WEBHOOK_MAX_LENGTH:
+            posts.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        posts.append(current)
+    return posts
+
+def webhook_retry_after(response):
+    """Returns the seconds a rate-limited (429) webhook asks us to wait, from the JSON body or Retry-After."""
+    try:
+        return max(0.0, float(response.json()["retry_after"]))
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", 1)))
+    except ValueError:
+        return 1.0
+
+def post_webhook(content):
+    """Posts one message to WEBHOOK_URL, waiting out rate limits instead of failing on them."""
+    # ✅ Player text must never ping @everyone, roles or users
+    payload = {"content": content, "allowed_mentions": {"parse": []}}
+    for attempt in range(WEBHOOK_RETRIES + 1):
+        response = requests.post(WEBHOOK_URL, json=payload, timeout=5)
+        if response.status_code != 429 or attempt == WEBHOOK_RETRIES:
+            response.raise_for_status()
+            return
+        time.sleep(webhook_retry_after(response))
+
+def send_webhook(events):
+    """Event bus handler: posts a batch of events to WEBHOOK_URL (Discord-compatible payload)."""
+    for content in split_webhook_content(format_events(events)):
+        post_webhook(content)
+
+def show_event_bus_stats():
+    """Prints lag and drop counts for every event bus subscriber."""
+    print("\n📨 Event Bus Subscribers")
+    print("===================")
+    for stats in EVENT_BUS.stats():
+        print(f"{stats['name']} ({stats['policy']}): queued {stats['queued']}, lag {stats['lag_seconds']:.2f}s, "
+              f"backlog {stats['backlog_seconds']:.2f}s, undelivered {stats['undelivered']}, "
+              f"delivered {stats['delivered']}/{stats['published']}, dropped {stats['dropped']}, "
+              f"coalesced {stats['coalesced']}, errors {stats['errors']}")
+
+    input("\nPress Enter to return to the main menu...")
+
+# ----- Event Subscribers -------------------------------------------------------------------------
+
+# ✅ A dropped auth event lets a non-VIP past the donor buffer, so the queue is large and every drop is reported
+EVENT_BUS.subscribe(
+    "vip_access", on_player_auth, kinds=[EVENT_PLAYER_AUTH],
+    maxsize=10000, policy="drop_newest", warn_on_drop=True
+)
+
+# ✅ One transaction per second at most, however many players join at once
+EVENT_BUS.subscribe(
+    "sessions", SESSION_STORE.write_batch,
+    kinds=[EVENT_PLAYER_AUTH, EVENT_PLAYER_LEAVE, EVENT_STATS, EVENT_SERVER_START, EVENT_SERVER_STOP],
+    maxsize=10000, policy="drop_newest", batch_size=500, batch_interval=1.0
+)
+
+# ✅ Bursts become a few posts, so a join storm or error flood stays inside the webhook's rate limit
+if WEBHOOK_URL:
+    EVENT_BUS.subscribe(
+        "webhook", send_webhook,
+        kinds=[EVENT_PLAYER_JOIN, EVENT_PLAYER_LEAVE, EVENT_CHAT, EVENT_ERROR],
+        maxsize=500, policy="drop_oldest", batch_size=WEBHOOK_BATCH_SIZE, batch_interval=WEBHOOK_BATCH_INTERVAL
+    )
+
 # ----- Functions (Server Manager Logic) -----
 def server_api_send():
     """ Allows the user to interact with any API endpoint and returns to the main menu after execution. """
@@ -737,6 +1833,219 @@ def server_api_send():
         input("\nPress Enter to return to the main menu...")  # ✅ Wait for user input before returning
         return  # ✅ Ensures the function exits back to main menuTry again.")
     
+def format_position(x, z):
+    """Formats a block position the way the in-game map shows it (E/W then N/S)."""
+    return f"{abs(x)} {'E' if x >= 0 else 'W'}, {abs(z)} {'N' if z >= 0 else 'S'}"
+
+def print_claims(title, claims, elapsed):
+    """Prints a land claim query result."""
+    print(f"\n📍 {title}: {len(claims)} claims ({elapsed * 1000:.1f} ms)")
+    for claim in claims:
+        last_login = (datetime.fromtimestamp(claim["last_login"]).strftime("%Y-%m-%d %H:%M")
+                      if claim["last_login"] else "unknown")
+        print(f"   {format_position(claim['x'], claim['z']):>20} (y {claim['y']}) | {claim['name']} "
+              f"({claim['steam_id']}) | last login {last_login} | {claim['save']}")
+
+def run_claim_query(index, query, values):
+    """Runs an expired/region/near query against the claim index and prints the result."""
+    start_time = time.perf_counter()
+
+    if query == "expired":
+        days = int(values[0]) if values else LAND_CLAIM_EXPIRY_DAYS
+        claims = index.expired(days)
+        title = f"Expired claims (owner away {days}+ days)"
+    elif query == "region":
+        region_x, region_z = (int(v) for v in values[:2])
+        claims = index.in_region(region_x, region_z)
+        title = f"Claims in region r.{region_x}.{region_z}.7rg"
+    elif query == "near":
+        x, z = (int(v) for v in values[:2])
+        radius = int(values[2]) if len(values) > 2 else 100
+        claims = index.near(x, z, radius)
+        title = f"Claims within {radius} blocks of {format_position(x, z)}"
+    else:
+        print("❌ Unknown claims query. Use expired, region or near.")
+        return
+
+    print_claims(title, claims, time.perf_counter() - start_time)
+
+def claims_menu():
+    """Land claim queries from the manager menu, then returns to the main menu."""
+    index = ClaimIndex()
+    changed = index.refresh()
+    print(f"🔄 Claim index refreshed ({changed} players updated).")
+
+    while True:
+        print("\n📍 Land Claims")
+        print("===================")
+        print("1. Expired claims printout")
+        print("2. Claims in a region")
+        print("3. Claims near X,Z")
+        print("9. Return to main menu")
+
+        choice = input("Enter your choice: ")
+
+        try:
+            if choice == "1":
+                days = input(f"Days since owner last login [{LAND_CLAIM_EXPIRY_DAYS}]: ").strip()
+                run_claim_query(index, "expired", [days] if days else [])
+            elif choice == "2":
+                run_claim_query(index, "region", input("Region X Z (from r.X.Z.7rg): ").split())
+            elif choice == "3":
+                run_claim_query(index, "near", input("X Z [radius] (West and South are negative): ").split())
+            elif choice == "9":
+                return
+            else:
+                print("❌ Invalid choice. Try again.")
+                continue
+        except ValueError:
+            print("❌ Invalid numbers. Try again.")
+            continue
+
+        input("\nPress Enter to return to the main menu...")
+        return
+
+def claims_cli(args):
+    """Handles `python 7DSM.py claims <expired [days] | region X Z | near X Z [radius]>`."""
+    if not args:
+        print("Usage: python 7DSM.py claims <expired [days] | region X Z | near X Z [radius]>")
+        return
+
+    index = ClaimIndex()
+    index.refresh()
+
+    try:
+        run_claim_query(index, args[0], args[1:])
+    except ValueError:
+        print("❌ Invalid numbers.")
+
+def format_duration(seconds):
+    """Formats seconds as hours and minutes."""
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+def run_session_query(query, values):
+    """Runs an hours/online/history query against the session store and prints the result."""
+    start_time = time.perf_counter()
+
+    if query == "hours":
+        steam_id = SESSION_STORE.find_steam_id(values[0]) if values else None
+        if not steam_id:
+            print("❌ Unknown player. Use a Steam ID or a name seen in a session.")
+            return
+
+        if len(values) > 1:
+            days = int(values[1])
+            since = time.time() - days * 86400
+            period = f"the last {days} days"
+        else:
+            since = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp()
+            period = "this month"
+
+        seconds = SESSION_STORE.played_seconds(steam_id, since)
+        print(f"\n⏱️ {steam_id} played {format_duration(seconds)} {period} ({(time.perf_counter() - start_time) * 1000:.1f} ms)")
+    elif query == "online":
+        at = datetime.strptime(" ".join(values), "%Y-%m-%d %H:%M:%S") if values else datetime.now()
+        rows = SESSION_STORE.online_at(at.timestamp())
+        print(f"\n👥 Online at {at:%Y-%m-%d %H:%M:%S}: {len(rows)} players ({(time.perf_counter() - start_time) * 1000:.1f} ms)")
+        for steam_id, name, start, end in rows:
+            print(f"   {name} ({steam_id}) | joined {datetime.fromtimestamp(start):%Y-%m-%d %H:%M:%S}")
+    elif query == "history":
+        steam_id = SESSION_STORE.find_steam_id(values[0]) if values else None
+        if not steam_id:
+            print("❌ Unknown player. Use a Steam ID or a name seen in a session.")
+            return
+
+        rows = SESSION_STORE.history(steam_id)
+        print(f"\n📜 Recent sessions for {steam_id} ({(time.perf_counter() - start_time) * 1000:.1f} ms)")
+        for name, start, end, end_reason in rows:
+            length = format_duration((end or time.time()) - start)
+            ended = f"{datetime.fromtimestamp(end):%H:%M:%S} ({end_reason})" if end else "online"
+            print(f"   {datetime.fromtimestamp(start):%Y-%m-%d %H:%M:%S} -> {ended} | {length} | {name}")
+    elif query == "compact":
+        removed = SESSION_STORE.compact()
+        print(f"✅ Compacted {removed} sessions older than {SESSION_STORE.retention_days} days into daily totals.")
+    else:
+        print("❌ Unknown sessions query. Use hours, online, history or compact.")
+
+def sessions_menu():
+    """Player session queries from the manager menu, then returns to the main menu."""
+    while True:
+        print("\n👥 Player Sessions")
+        print("===================")
+        print("1. Hours played by a player")
+        print("2. Who was online at a time")
+        print("3. Recent sessions for a player")
+        print("4. Compact old sessions")
+        print("9. Return to main menu")
+
+        choice = input("Enter your choice: ")
+
+        try:
+            if choice == "1":
+                player = input("Steam ID or name: ").strip()
+                days = input("Days to look back [this month]: ").strip()
+                run_session_query("hours", [player] + ([days] if days else []))
+            elif choice == "2":
+                at = input("Time (YYYY-MM-DD HH:MM:SS) [now]: ").strip()
+                run_session_query("online", at.split())
+            elif choice == "3":
+                run_session_query("history", [input("Steam ID or name: ").strip()])
+            elif choice == "4":
+                run_session_query("compact", [])
+            elif choice == "9":
+                return
+            else:
+                print("❌ Invalid choice. Try again.")
+                continue
+        except ValueError:
+            print("❌ Invalid number or time. Try again.")
+            continue
+
+        input("\nPress Enter to return to the main menu...")
+        return
+
+def sessions_cli(args):
+    """Handles `python 7DSM.py sessions <hours PLAYER [days] | online [YYYY-MM-DD HH:MM:SS] | history PLAYER | compact>`."""
+    if not args:
+        print("Usage: python 7DSM.py sessions <hours PLAYER [days] | online [YYYY-MM-DD HH:MM:SS] | history PLAYER | compact>")
+        return
+
+    try:
+        run_session_query(args[0], args[1:])
+    except ValueError:
+        print("❌ Invalid number or time.")
+
+def region_reset_menu():
+    """Shows the region reset report or resets untouched regions, then returns to the main menu."""
+    while True:
+        print("\n🗺️ Region Reset")
+        print("===================")
+        print("1. Dry run report (nothing is deleted)")
+        print("2. Reset untouched regions (server must be stopped)")
+        print("9. Return to main menu")
+
+        choice = input("Enter your choice: ")
+
+        if choice == "9":
+            return
+        if choice not in ("1", "2"):
+            print("❌ Invalid choice. Try again.")
+            continue
+
+        days_input = input(f"Days since last visit [{REGIONRESET_DAYS}]: ").strip()
+        days = int(days_input) if days_input.isdigit() else REGIONRESET_DAYS
+
+        if choice == "1":
+            region_reset(days, dry_run=True)
+        elif input("⚠ Regions will be deleted. Back up first! Type RESET to confirm: ").strip() == "RESET":
+            region_reset(days, dry_run=False)
+        else:
+            print("↩ Region reset cancelled.")
+
+        input("\nPress Enter to return to the main menu...")
+        return
+
 # ----- Main --------------------------------------------------------------------------------------
 async def main_menu():
     """Displays the main menu and handles user input."""
@@ -750,7 +2059,11 @@ async def main_menu():
         print("3. Start Server")
         print("4. Backup")
         print("5. Server API")
+        print("6. Region Reset")
+        print("7. Land Claims")
+        print("8. Event Bus Stats")
         print("9. Exit (Kills server if running)")
+        print("10. Player Sessions")
         choice = input("Enter your choice: ")
         if choice == "1":
             install_steam()
@@ -763,13 +2076,29 @@ async def main_menu():
             backup()
         elif choice == "5":
             server_api_send()
+        elif choice == "6":
+            region_reset_menu()
+        elif choice == "7":
+            claims_menu()
+        elif choice == "8":
+            show_event_bus_stats()
+        elif choice == "10":
+            sessions_menu()
         elif choice == "9":
             await stop()
         else:
             print("Invalid choice. Try again.")
 
 def main():
-    """Starts the program and displays the menu."""
+    """Starts the program and displays the menu, or runs a command line query."""
+    if len(sys.argv) > 1 and sys.argv[1] == "claims":
+        claims_cli(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "sessions":
+        sessions_cli(sys.argv[2:])
+        return
+
     asyncio.run(main_menu())  # ✅ Calls main_menu() directly, no loop needed here
 
 # ----- Program  ----------------------------------------------------------------------------------
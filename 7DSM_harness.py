@@ -0,0 +1,612 @@
+# ----- Imports -----------------------------------------------------------------------------------
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import psutil
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ----- About -------------------------------------------------------------------------------------
+# 7DSM Harness - load and regression benchmarks for 7DSM without a real game server.
+#
+# A stand-in 7DaysToDieServer.exe (a Python script, Linux only) prints realistic log streams,
+# and a stub web API records every /api/command call. The harness drives the real 7DSM.py
+# functions against them and reports throughput, log-line-to-kick latency and memory.
+#
+# Usage:
+#   python 7DSM_harness.py all
+#   python 7DSM_harness.py throughput --lines 200000 --rate 0
+#   python 7DSM_harness.py join-storm --players 50 --auth-delay 0
+#   python 7DSM_harness.py all --save baseline.json
+#   python 7DSM_harness.py all --baseline baseline.json --tolerance 0.2
+
+# ----- Global Variables --------------------------------------------------------------------------
+
+HARNESS_PATH = os.path.abspath(__file__)
+MANAGER_PATH = os.path.join(os.path.dirname(HARNESS_PATH), "7DSM.py")
+SCENARIOS = ["throughput", "error-storm", "join-storm", "event-bus", "crash-restart"]
+WEBHOOK_PATH = "/webhook"
+
+# ✅ Per-scenario metrics compared against a saved baseline, and whether higher values are better
+BASELINE_METRICS = {
+    "lines_per_sec": True,
+    "kick_latency_p95": False,
+    "restart_latency_mean": False,
+}
+# ✅ Whole-run metrics, compared once
+BASELINE_RUN_METRICS = {
+    "peak_rss_mb": False,
+}
+
+# ----- Fake Dedicated Server ---------------------------------------------------------------------
+
+def log_prefix(uptime):
+    """Builds the timestamp/uptime prefix the dedicated server puts on every line."""
+    return f"{datetime.now().strftime('%Y-%m-%dT%H:%M:%S')} {uptime:.3f}"
+
+def steam_id_for(seq):
+    """Returns a stable fake Steam ID for a player sequence number."""
+    return f"7656119{seq:010d}"
+
+def stat_line(uptime, players):
+    """Returns a periodic server stats line, including the `Ply:` player count."""
+    return (f"{log_prefix(uptime)} INF Time: {uptime / 60:.2f}m FPS: {random.uniform(25, 60):.2f} "
+            f"Heap: 1843.2MB Max: 2048.0MB Chunks: 812 CGO: 41 Ply: {players} Zom: {random.randint(0, 60)} "
+            f"Ent: {random.randint(10, 90)} (120) Items: 0 CO: 3 RSS: 4211.7MB")
+
+def join_lines(uptime, seq):
+    """Returns the login, auth and Steamworks lines printed when a player joins."""
+    name = f"Player{seq}"
+    steam_id = steam_id_for(seq)
+    return [
+        f"{log_prefix(uptime)} INF PlayerLogin: {name}/V 1.2",
+        f"{log_prefix(uptime)} INF [Auth] {name} authorization successful: EntityID={170 + seq}, "
+        f"PltfmId='Steam_{steam_id}', CrossId='EOS_{seq:032x}', OwnerID='Steam_{steam_id}', PlayerName='{name}'",
+        f"{log_prefix(uptime)} INF [Steamworks.NET] Authenticating player: {name} SteamId: {steam_id} "
+        f"TicketLen: 1024 Result: k_EBeginAuthSessionResultOK",
+    ]
+
+def leave_line(uptime, seq):
+    """Returns the disconnect line printed when a player leaves."""
+    steam_id = steam_id_for(seq)
+    return (f"{log_prefix(uptime)} INF Player disconnected: EntityID={170 + seq}, PltfmId='Steam_{steam_id}', "
+            f"CrossId='EOS_{seq:032x}', OwnerID='Steam_{steam_id}', PlayerName='Player{seq}'")
+
+def chat_line(uptime, seq):
+    """Returns a global chat line."""
+    return (f"{log_prefix(uptime)} INF Chat (from 'Steam_{steam_id_for(seq)}', entity id '{170 + seq}', "
+            f"to 'Global'): 'Player{seq}': {random.choice(['hi', 'trader?', 'horde tonight', 'gg'])}")
+
+def error_lines(uptime):
+    """Returns an exception with a short stack trace."""
+    return [
+        f"{log_prefix(uptime)} ERR Exception in chunk observer",
+        f"{log_prefix(uptime)} EXC NullReferenceException: Object reference not set to an instance of an object",
+        "  at ChunkCluster.GetChunkSync (Int32 _x, Int32 _y) [0x00000] in <filename unknown>:0",
+        "  at World.UpdateChunkObservers () [0x00012] in <filename unknown>:0",
+    ]
+
+def script_lines(cfg):
+    """Yields (line, steam_id_or_None) pairs for the configured profile, after the startup banner."""
+    profile = cfg["profile"]
+    max_players = cfg["max_players"]
+    start = time.time()
+
+    def uptime():
+        return time.time() - start
+
+    yield f"{log_prefix(uptime())} INF Started Webserver on 8080", None
+    yield f"{log_prefix(uptime())} INF Maximum allowed players: {max_players}", None
+
+    if profile == "join-storm":
+        # ✅ Server is already inside the donor buffer, then a burst of players authenticates
+        yield stat_line(uptime(), max_players), None
+        for seq in range(cfg["players"]):
+            for line in join_lines(uptime(), seq):
+                yield line, (steam_id_for(seq) if "Steamworks.NET" in line else None)
+        return
+
+    if profile == "error-storm":
+        for i in range(cfg["lines"]):
+            if i % 5 == 0:
+                for line in error_lines(uptime()):
+                    yield line, None
+            else:
+                yield stat_line(uptime(), 0), None
+        return
+
+    # ✅ Mixed traffic: stats, filler, shader spam, chat, joins/leaves and the odd error
+    online = []
+    seq = 0
+    for i in range(cfg["lines"]):
+        roll = i % 100
+        if roll == 0:
+            for line in error_lines(uptime()):
+                yield line, None
+        elif roll < 5:
+            yield "WARNING: Shader Unsupported: 'Hidden/Nature/Terrain/Splatmap' - Pass '' has no vertex shader", None
+        elif roll < 10 and len(online) < max_players // 2:
+            for line in join_lines(uptime(), seq):
+                yield line, None
+            online.append(seq)
+            seq += 1
+        elif roll < 12 and online:
+            yield leave_line(uptime(), online.pop(0)), None
+        elif roll < 20 and online:
+            yield chat_line(uptime(), random.choice(online)), None
+        elif roll < 30:
+            yield stat_line(uptime(), len(online)), None
+        else:
+            yield f"{log_prefix(uptime())} INF [EOS] Received {random.randint(1, 64)} bytes from peer", None
+
+def fake_server(config_path):
+    """Runs the stand-in dedicated server: prints the scripted log stream to stdout."""
+    with open(config_path, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+
+    launched = time.time()
+    with open(cfg["launches_path"], "a", encoding="utf-8") as f:
+        f.write(f"launch {launched}\n")
+
+    interval = 1.0 / cfg["rate"] if cfg["rate"] else 0
+    next_emit = time.time()
+    crash_after = cfg.get("crash_after")
+
+    try:
+        with open(cfg["events_path"], "a", encoding="utf-8") as events:
+            for line, steam_id in script_lines(cfg):
+                if interval:
+                    next_emit += interval
+                    delay = next_emit - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                sys.stdout.write(line + "\n")
+
+                if steam_id:
+                    # ✅ Flush first so the emit time is when the manager can actually read the line
+                    sys.stdout.flush()
+                    events.write(f"{steam_id} {time.time()}\n")
+                    events.flush()
+
+                if crash_after is not None and time.time() - launched > crash_after:
+                    break
+
+            sys.stdout.flush()
+
+            # ✅ Idle like a live server, printing stats until held time runs out or we crash
+            hold = cfg.get("hold")
+            while hold is None or time.time() - launched < hold:
+                if crash_after is not None and time.time() - launched > crash_after:
+                    with open(cfg["launches_path"], "a", encoding="utf-8") as f:
+                        f.write(f"crash {time.time()}\n")
+                    sys.stdout.write(f"{log_prefix(time.time() - launched)} ERR FATAL: simulated crash\n")
+                    sys.stdout.flush()
+                    os._exit(1)
+                sys.stdout.write(stat_line(time.time() - launched, 0) + "\n")
+                sys.stdout.flush()
+                time.sleep(1)
+
+    except BrokenPipeError:
+        pass  # ✅ The manager went away, exit like the real server would
+
+    os._exit(0)
+
+def install_fake_server(server_dir, cfg):
+    """Writes the stand-in 7DaysToDieServer.exe, its config and a minimal serverconfig.xml/serveradmin.xml."""
+    os.makedirs(os.path.join(server_dir, "UserDataFolder", "Saves"), exist_ok=True)
+    config_path = os.path.join(server_dir, "fake_server.json")
+
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(cfg, f)
+
+    # ✅ Direct shebang (no /usr/bin/env) so the process name stays 7DaysToDieServer.exe
+    exe_path = os.path.join(server_dir, "7DaysToDieServer.exe")
+    with open(exe_path, "w", encoding="utf-8") as f:
+        f.write(f"#!{sys.executable}\n"
+                "import importlib.util\n"
+                f"spec = importlib.util.spec_from_file_location('sdsm_harness', {HARNESS_PATH!r})\n"
+                "harness = importlib.util.module_from_spec(spec)\n"
+                "spec.loader.exec_module(harness)\n"
+                f"harness.fake_server({config_path!r})\n")
+    os.chmod(exe_path, 0o755)
+
+    with open(os.path.join(server_dir, "serverconfig.xml"), "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0"?>\n<ServerSettings>\n\t<property name="ServerPort" value="26900"/>\n</ServerSettings>\n')
+
+    with open(os.path.join(server_dir, "UserDataFolder", "Saves", "serveradmin.xml"), "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<adminTools>\n<apitokens>\n</apitokens>\n</adminTools>\n')
+
+    return exe_path
+
+# ----- Stub Web API ------------------------------------------------------------------------------
+
+class StubAPI:
+    """Minimal stand-in for the server web API that records every request."""
+
+    def __init__(self, delays=None):
+        """Starts the stub on a free localhost port. `delays` maps a path to seconds to stall before replying."""
+        self.calls = []
+        self.delays = delays or {}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.record(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                try:
+                    data = json.loads(body) if body else None
+                except ValueError:
+                    data = None
+                stub.record(self, data)
+
+            def log_message(self, format, *args):
+                pass  # ✅ Keep benchmark output clean
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def record(self, handler, data):
+        """Stores a request and replies with an empty JSON object."""
+        time.sleep(self.delays.get(handler.path, 0))  # ✅ Simulate a slow remote endpoint
+
+        with self.lock:
+            self.calls.append({
+                "time": time.time(),
+                "method": handler.command,
+                "path": handler.path,
+                "token": handler.headers.get("X-SDTD-API-TOKENNAME"),
+                "data": data,
+            })
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.end_headers()
+        handler.wfile.write(b"{}")
+
+    def commands(self):
+        """Returns recorded /api/command POST calls."""
+        with self.lock:
+            return [c for c in self.calls if c["method"] == "POST" and c["path"] == "/api/command"]
+
+    def close(self):
+        """Stops the stub server."""
+        self.server.shutdown()
+
+# ----- Harness -----------------------------------------------------------------------------------
+
+class RSSMonitor:
+    """Samples this process's resident memory in the background and keeps the peak."""
+
+    def __init__(self, interval=0.1):
+        self.process = psutil.Process(os.getpid())
+        self.interval = interval
+        self.start = self.process.memory_info().rss
+        self.peak = self.start
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def stop(self):
+        """Stops sampling and returns (peak RSS, growth over the starting RSS) in MB."""
+        self.running = False
+        self.thread.join()
+        return round(self.peak / (1024 * 1024), 1), round((self.peak - self.start) / (1024 * 1024), 1)
+
+def load_manager(stub, work_dir, args):
+    """Imports 7DSM.py and points its globals at the sandbox, stub API and harness settings."""
+    # ✅ ServerAPI refuses to load without credentials
+    os.environ.setdefault("APITOKEN_Name", "harness")
+    os.environ.setdefault("APITOKEN_Secret", "harness")
+    os.environ.setdefault("APITOKEN_Permission", "0")
+
+    spec = importlib.util.spec_from_file_location("sdsm", MANAGER_PATH)
+    manager = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(manager)
+
+    server_dir = os.path.join(work_dir, "Server")
+    manager.SERVER_DIR = server_dir
+    manager.SERVER_CONFIG_PATH = os.path.join(server_dir, "serverconfig.xml")
+    manager.SERVERADMIN_PATH = os.path.join(server_dir, "UserDataFolder", "Saves", "serveradmin.xml")
+    manager.VIP_LIST_PATH = os.path.join(work_dir, "vip_list.txt")
+    manager.DONORBUFFER_SIZE = args.donor_buffer
+    manager.api = manager.ServerAPI(base_url=stub.base_url)
+    manager.SESSION_STORE.path = os.path.join(work_dir, "sessions.db")
+
+    if args.auth_delay is not None:
+        manager.STEAM_AUTH_DELAY = args.auth_delay
+
+    async def idle_menu():
+        """Stands in for the interactive menu that start() returns to."""
+        while True:
+            await asyncio.sleep(3600)
+
+    manager.main_menu = idle_menu
+    return manager
+
+def fake_server_config(work_dir, args, profile, **overrides):
+    """Builds the stand-in server config for a scenario."""
+    cfg = {
+        "profile": profile,
+        "rate": args.rate,
+        "lines": args.lines,
+        "players": args.players,
+        "max_players": args.max_players,
+        "crash_after": None,
+        "hold": 0,
+        "events_path": os.path.join(work_dir, "events.txt"),
+        "launches_path": os.path.join(work_dir, "launches.txt"),
+    }
+    cfg.update(overrides)
+
+    for path in (cfg["events_path"], cfg["launches_path"]):
+        open(path, "w").close()
+
+    return cfg
+
+def stream_once(manager, exe_path, work_dir):
+    """Launches the stand-in server like start() does and runs stream_logs_to_files() to completion."""
+    logs_dir = os.path.join(work_dir, "Logs")
+    os.makedirs(logs_dir, exist_ok=True)
+    main_log = os.path.join(logs_dir, "log.txt")
+    error_log = os.path.join(logs_dir, "error.txt")
+
+    process = subprocess.Popen(
+        [exe_path, "-quit", "-batchmode", "-nographics", "-configfile=serverconfig.xml", "-dedicated"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.PIPE,
+        text=True
+    )
+
+    start_time = time.time()
+    manager.stream_logs_to_files(process, main_log, error_log)
+    elapsed = time.time() - start_time
+    process.wait()
+
+    with open(main_log, "r", encoding="utf-8") as f:
+        lines = sum(1 for _ in f)
+
+    return lines, elapsed, os.path.getsize(error_log)
+
+def percentile(values, pct):
+    """Returns the pct percentile of values (nearest rank)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def run_throughput(manager, stub, work_dir, args, profile="mixed"):
+    """Measures how fast stream_logs_to_files() ingests a mixed (or error-heavy) log stream."""
+    cfg = fake_server_config(work_dir, args, profile)
+    exe_path = install_fake_server(os.path.join(work_dir, "Server"), cfg)
+
+    lines, elapsed, error_bytes = stream_once(manager, exe_path, work_dir)
+    return {
+        "lines": lines,
+        "seconds": round(elapsed, 3),
+        "lines_per_sec": round(lines / elapsed, 1) if elapsed else None,
+        "error_log_bytes": error_bytes,
+        "api_calls": len(stub.commands()),
+    }
+
+def run_join_storm(manager, stub, work_dir, args):
+    """Floods joins while the server sits in the donor buffer and measures log-line-to-kick latency."""
+    cfg = fake_server_config(work_dir, args, "join-storm", rate=0)
+    exe_path = install_fake_server(os.path.join(work_dir, "Server"), cfg)
+
+    # ✅ Every fifth player is a VIP and must not be kicked
+    vip_ids = {f"Steam_{steam_id_for(seq)}" for seq in range(0, args.players, 5)}
+    with open(manager.VIP_LIST_PATH, "w", encoding="utf-8") as f:
+        for steam_id in sorted(vip_ids):
+            f.write(f"{steam_id} VIP 2099-12-31 23:59:59\n")
+
+    stub_calls_before = len(stub.commands())
+    batches_before = manager.SESSION_STORE.batches
+    start_time = time.time()
+    _, elapsed, _ = stream_once(manager, exe_path, work_dir)
+    manager.EVENT_BUS.drain(timeout=args.players * (manager.STEAM_AUTH_DELAY + 5))  # ✅ Kicks run on the bus
+    drained = time.time() - start_time
+
+    emitted = {}
+    with open(cfg["events_path"], "r", encoding="utf-8") as f:
+        for line in f:
+            steam_id, emitted_at = line.split()
+            emitted[f"Steam_{steam_id}"] = float(emitted_at)
+
+    latencies = []
+    kicked = set()
+    for call in stub.commands()[stub_calls_before:]:
+        command = (call["data"] or {}).get("command", "")
+        if not command.startswith("kick "):
+            continue
+        steam_id = command.split()[1]
+        kicked.add(steam_id)
+        if steam_id in emitted:
+            latencies.append(call["time"] - emitted[steam_id])
+
+    expected = set(emitted) - vip_ids
+    return {
+        "players": len(emitted),
+        "kicks": len(kicked),
+        "missed_kicks": len(expected - kicked),
+        "vips_kicked": len(kicked & vip_ids),
+        "seconds": round(elapsed, 3),
+        "seconds_until_kicked": round(drained, 3),
+        "kick_latency_mean": round(statistics.mean(latencies), 3) if latencies else None,
+        "kick_latency_p95": round(percentile(latencies, 95), 3) if latencies else None,
+        "kick_latency_max": round(max(latencies), 3) if latencies else None,
+        "session_transactions": manager.SESSION_STORE.batches - batches_before,  # ✅ Stays flat as players grow
+    }
+
+def run_event_bus(manager, stub, work_dir, args):
+    """Streams mixed traffic with a slow webhook subscriber and checks ingestion keeps its pace."""
+    manager.WEBHOOK_URL = f"{stub.base_url}{WEBHOOK_PATH}"
+    subscriber = manager.EVENT_BUS.subscribe(
+        "harness_webhook", manager.send_webhook,
+        kinds=[manager.EVENT_PLAYER_JOIN, manager.EVENT_PLAYER_LEAVE, manager.EVENT_CHAT, manager.EVENT_ERROR],
+        maxsize=args.queue_size, policy="drop_oldest",
+        batch_size=manager.WEBHOOK_BATCH_SIZE, batch_interval=manager.WEBHOOK_BATCH_INTERVAL
+    )
+
+    results = run_throughput(manager, stub, work_dir, args)
+    stats = subscriber.stats()
+    manager.EVENT_BUS.unsubscribe(subscriber)
+
+    results.update({
+        "webhook_delay": args.webhook_delay,
+        "webhook_published": stats["published"],
+        "webhook_delivered": stats["delivered"],
+        "webhook_dropped": stats["dropped"],
+        "webhook_queued": stats["queued"],
+        "webhook_lag_seconds": stats["lag_seconds"],
+        "webhook_backlog_seconds": stats["backlog_seconds"],
+    })
+    return results
+
+def run_crash_restart(manager, stub, work_dir, args):
+    """Drives start() and monitor_server() against a server that crashes, and times the restarts."""
+    cfg = fake_server_config(work_dir, args, "mixed", lines=200, rate=100, crash_after=args.crash_after, hold=None)
+    install_fake_server(os.path.join(work_dir, "Server"), cfg)
+
+    threading.Thread(target=lambda: asyncio.run(manager.start()), daemon=True).start()
+    time.sleep(args.duration)
+    manager.kill_server_process()
+
+    launches, crashes = [], []
+    with open(cfg["launches_path"], "r", encoding="utf-8") as f:
+        for line in f:
+            kind, at = line.split()
+            (launches if kind == "launch" else crashes).append(float(at))
+
+    # ✅ Pair each crash with the first launch after it
+    gaps = []
+    for crashed_at in crashes:
+        later = [t for t in launches if t > crashed_at]
+        if later:
+            gaps.append(min(later) - crashed_at)
+
+    return {
+        "launches": len(launches),
+        "crashes": len(crashes),
+        "restarts": len(gaps),
+        "extra_launches": max(0, len(launches) - len(gaps) - 1),  # ✅ Duplicate restarts from stacked monitors
+        "restart_latency_mean": round(statistics.mean(gaps), 3) if gaps else None,
+        "restart_latency_max": round(max(gaps), 3) if gaps else None,
+    }
+
+def compare_metrics(label, results, previous_results, metrics, tolerance):
+    """Returns regressions for one set of metrics against the same set from the baseline."""
+    regressions = []
+    for metric, higher_is_better in metrics.items():
+        current = results.get(metric)
+        previous = previous_results.get(metric)
+        if current is None or not previous:
+            continue
+
+        change = (current - previous) / previous
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{label}{metric}: {previous} -> {current} ({change:+.0%})")
+    return regressions
+
+def compare_to_baseline(report, baseline, tolerance):
+    """Returns a list of regressions where a metric is worse than the baseline by more than tolerance."""
+    regressions = compare_metrics("", report, baseline, BASELINE_RUN_METRICS, tolerance)
+    for scenario, results in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario, {})
+        regressions += compare_metrics(f"{scenario}.", results, previous, BASELINE_METRICS, tolerance)
+    return regressions
+
+def main():
+    """Parses arguments, runs the requested scenarios and prints the report."""
+    parser = argparse.ArgumentParser(description="7DSM load and regression benchmarks (Linux).")
+    parser.add_argument("scenario", choices=SCENARIOS + ["all"])
+    parser.add_argument("--lines", type=int, default=50000, help="Log lines per stream scenario.")
+    parser.add_argument("--rate", type=float, default=0, help="Lines per second, 0 for as fast as possible.")
+    parser.add_argument("--players", type=int, default=20, help="Players in the join storm.")
+    parser.add_argument("--max-players", type=int, default=10)
+    parser.add_argument("--donor-buffer", type=int, default=2)
+    parser.add_argument("--auth-delay", type=float, default=None, help="Override STEAM_AUTH_DELAY (seconds).")
+    parser.add_argument("--webhook-delay", type=float, default=0.05, help="Seconds the stub webhook stalls per call.")
+    parser.add_argument("--queue-size", type=int, default=500, help="Webhook subscriber queue size.")
+    parser.add_argument("--crash-after", type=float, default=8, help="Seconds until the fake server crashes.")
+    parser.add_argument("--duration", type=float, default=45, help="Seconds to run the crash-restart scenario.")
+    parser.add_argument("--save", help="Write the report to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against a saved report and fail on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression, 0.2 = 20%%.")
+    args = parser.parse_args()
+
+    if sys.platform.startswith("win"):
+        print("❌ The harness runs the stand-in server as a script and needs Linux.")
+        sys.exit(2)
+
+    work_dir = tempfile.mkdtemp(prefix="7dsm_harness_")
+    stub = StubAPI(delays={WEBHOOK_PATH: args.webhook_delay})
+    manager = load_manager(stub, work_dir, args)
+    run_rss = RSSMonitor()
+
+    runners = {
+        "throughput": lambda: run_throughput(manager, stub, work_dir, args),
+        "error-storm": lambda: run_throughput(manager, stub, work_dir, args, profile="error-storm"),
+        "join-storm": lambda: run_join_storm(manager, stub, work_dir, args),
+        "event-bus": lambda: run_event_bus(manager, stub, work_dir, args),
+        "crash-restart": lambda: run_crash_restart(manager, stub, work_dir, args),
+    }
+    # ✅ crash-restart leaves monitor threads behind, so it always runs last
+    selected = SCENARIOS if args.scenario == "all" else [args.scenario]
+
+    report = {"created": time.strftime("%Y-%m-%d_%H-%M-%S"), "work_dir": work_dir, "scenarios": {}}
+    for name in selected:
+        print(f"🧪 Running {name}...")
+        scenario_rss = RSSMonitor()
+        report["scenarios"][name] = runners[name]()
+        _, report["scenarios"][name]["rss_growth_mb"] = scenario_rss.stop()  # ✅ Memory this scenario added
+
+    report["peak_rss_mb"], _ = run_rss.stop()
+    report["event_bus"] = manager.EVENT_BUS.stats()
+    stub.close()
+
+    print("\n📊 Harness Report")
+    print(json.dumps(report, indent=4))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"✅ Report saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+
+        if regressions:
+            print("❌ Performance regressions:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("✅ No regressions against baseline.")
+
+# ----- Program  ----------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()